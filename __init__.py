@@ -1,18 +1,46 @@
 import pygame
 import random
 import json
-import copy
 import sys
+import os
+import gc
+import time
+import threading
+import argparse
+import subprocess
+import tracemalloc
+import traceback
 from datetime import datetime
 from abc import ABC, abstractmethod
-
-# Инициализация Pygame
-pygame.init()
+from telemetry import (Telemetry, EVENT_HIT, EVENT_MISS, EVENT_HEART, EVENT_EVIL, EVENT_SHUFFLE,
+                       EVENT_REACTION, EVENT_GAME_OVER)
+from records import records_format_feets, save_record
+from score_service import ScoreClient, ScoresNotLoaded, DEFAULT_ADDRESS
+from capture import FrameCapture
+from state_export import StateExport, DEFAULT_NAME as STATE_EXPORT_NAME
+
+# psutil не обязателен: без него память замеряется средствами ОС
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 # Настройки окна
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Color Gates Game")
+screen = None
+
+
+# Инициализация Pygame и окна. Выполняется при запуске игры, а не при импорте:
+# процессы multiprocessing на Windows и macOS заново импортируют главный модуль
+def init_display(headless=False):
+    global screen
+    if headless:
+        # Длительный прогон (--soak) работает без окна и звука
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Color Gates Game")
 
 # Цвета
 COLORS = {
@@ -60,6 +88,8 @@ class GameObject(ABC):
         self.lane = lane
         self.x = lane * (WIDTH // 4)
         self.y = 0
+        self.spawn_time = 0  # Время появления, мс
+        self.reacted = False  # Игрок уже переключал ворота под этот объект
 
     @abstractmethod
     def move(self):
@@ -142,6 +172,129 @@ def generate_objects():
         return [Heart(lane)]
 
 
+# Заранее отрисованные страницы таблицы рекордов
+class HighScoresCache:
+    page_height = HEIGHT // 2
+    check_interval = 0.5  # Период проверки изменений, пока таблица открыта, с
+
+    def __init__(self, game):
+        self.game = game
+        self.status = 'pending'  # 'pending', 'ok', 'missing', 'broken'
+        self.pages = {}
+        self.page_count = 0
+        self.scores_height = 0
+        self.signature = None
+        self.checked_at = 0
+        self.generation = 0
+        self.requested = threading.Event()
+        self.thread = None
+        font = pygame.font.Font(None, 36)
+        self.placeholder = font.render("Загрузка...", True, (255, 255, 255))
+        self.footer = [
+            (font.render("Нажмите Esc для возврата в меню.", True, (255, 255, 255)), (50, HEIGHT - 100)),
+            (font.render("Используйте колесико мышки для навигации.", True, (255, 255, 255)), (50, HEIGHT - 50)),
+        ]
+
+    def refresh(self):
+        # Перестраиваем страницы, только если таблица изменилась
+        self.checked_at = time.monotonic()
+        signature = self.game.scores_signature()
+        if self.thread is not None and signature == self.signature:
+            return
+        self.signature = signature
+        self.generation += 1
+        self.requested.set()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.render_loop, name="high-scores", daemon=True)
+            self.thread.start()
+
+    def poll(self):
+        # Пока таблица открыта, рекорды могут прийти от других киосков
+        # или из запроса к сервису, начатого при прошлой проверке
+        if time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh()
+
+    def render_loop(self):
+        while True:
+            self.requested.wait()
+            self.requested.clear()
+            self.render(self.generation)
+
+    def layout(self, scores):
+        # Та же раскладка, что и при отрисовке прямо на экран
+        game = self.game
+        lines = []
+        y = game.score_info_start
+        for player, records in scores.items():
+            lines.append((f"Игрок: {player}:", 50, y))
+            y += game.score_info_start
+            for record in records:
+                score, date_time, level_type, speed, evil_block_acivated = record
+                lines.append((f"Счет: {score}, Дата: {date_time},", 70, y))
+                y += game.score_info_step
+                lines.append((f"Уровень: {level_type}, Скорость: {speed},", 70, y))
+                y += game.score_info_step
+                lines.append((f"Активация блоков: {evil_block_acivated}.", 70, y))
+                y += game.score_info_start
+            y += game.score_block_step
+        return lines, y
+
+    def render(self, generation):
+        try:
+            scores = self.game.load_scores()
+        except FileNotFoundError:
+            self.status = 'missing'
+            return
+        except json.JSONDecodeError:
+            self.status = 'broken'
+            return
+        except ScoresNotLoaded:
+            # Таблица еще едет из сервиса - показываем заглушку
+            self.status = 'pending'
+            return
+        if not records_format_feets(scores):
+            self.status = 'broken'
+            return
+
+        lines, height = self.layout(scores)
+        font = pygame.font.Font(None, 36)
+        line_height = font.get_linesize()
+        pages = {}
+        self.pages = pages
+        self.page_count = height // self.page_height + 1
+        self.scores_height = height - (HEIGHT // 2)
+        self.status = 'ok'
+
+        # Страницы публикуются по мере готовности, начиная с первой
+        first = 0
+        for number in range(self.page_count):
+            if generation != self.generation:
+                return  # Таблица снова изменилась, результат уже не нужен
+            top = number * self.page_height
+            page = pygame.Surface((WIDTH, self.page_height), 0, screen)
+            page.fill((0, 0, 0))
+            while first < len(lines) and lines[first][2] + line_height <= top:
+                first += 1
+            for text, x, y in lines[first:]:
+                if y >= top + self.page_height:
+                    break
+                page.blit(font.render(text, True, (255, 255, 255)), (x, y - top))
+            pages[number] = page
+
+    def draw(self, scroll_offset):
+        visible = HEIGHT - 120
+        first = scroll_offset // self.page_height
+        last = min(self.page_count - 1, (scroll_offset + visible) // self.page_height)
+        pages = self.pages
+        for number in range(first, last + 1):
+            y = number * self.page_height - scroll_offset
+            page = pages.get(number)
+            if page is None:
+                screen.blit(self.placeholder, (50, max(y, 0) + 20))
+            else:
+                screen.blit(page, (0, y))
+
+
 # Класс игры
 class Game:
     def __init__(self):
@@ -168,82 +321,53 @@ class Game:
         self.level_type = "normal"  # Тип уровня: "normal", "single_color", "multi_color"
         self.speed = 20  # Скорость падения объектов
         self.scroll_offset = 0  # Смещение для скролла таблицы рекордов
+        # Источники времени и ввода (подменяются в режиме длительного прогона)
+        self.get_ticks = pygame.time.get_ticks
+        self.get_pressed = pygame.key.get_pressed
+        self.telemetry = None  # Включается параметром --telemetry
+        self.score_client = None  # Включается параметром --score-service
+        self.high_scores_cache = HighScoresCache(self)
+        self.capture = None  # Включается параметром --capture
+        self.state_export = None  # Включается параметром --export-state
 
     import json
     from datetime import datetime
 
     def save_score(self, name, score):
-        try:
-            with open('scores.json', 'r') as file:
-                scores = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            scores = {}
-
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record = [score, current_time, self.level_type, self.speed, self.evil_blocks_activated]
 
-        # Удаляем перебитые рекорды
-        if name in scores:
-            # Фильтруем записи, оставляя только те, которые не соответствуют условиям удаления
-            scores[name] = [record for record in scores[name] if not (
-                    record[2] == self.level_type and  # 1. Тип уровня совпадает
-                    record[4] <= self.evil_blocks_activated and  # 2. Если выбор препятствий <=
-                    record[3] <= self.speed and  # 3. Скорость <= текущей
-                    record[0] <= score  # 4. Очки <= текущим
-            )]
-
-        # Добавляем новый рекорд
-        if name in scores:
-            scores[name].append([score, current_time, self.level_type, self.speed, self.evil_blocks_activated])
+        if self.score_client:
+            # Запрос уходит в фоне; если сервис недоступен, клиент сам запишет файл
+            self.score_client.save(name, record)
         else:
-            scores[name] = [[score, current_time, self.level_type, self.speed, self.evil_blocks_activated]]
+            save_record('scores.json', name, record)
 
+    def load_scores(self):
+        # Таблица из кэша сервиса, а если сервис недоступен - из файла.
+        # Пока кэш пуст, клиент бросает ScoresNotLoaded
+        scores = self.score_client.scores() if self.score_client else None
+        if scores is None:
+            with open('scores.json', 'r') as file:
+                scores = json.load(file)
+        return scores
+
+    def scores_signature(self):
+        # Признак изменения таблицы: версия в сервисе или время и размер файла
+        if self.score_client:
+            try:
+                if self.score_client.scores() is not None:
+                    return 'service', self.score_client.version
+            except ScoresNotLoaded:
+                return 'service', None
         try:
-            with open('scores.json', 'w') as file:
-                json.dump(scores, file, indent=4)
-        except IOError as e:
-            print(f"Ошибка при сохранении файла: {e}.")
-        finally:
-            pass
+            stat = os.stat('scores.json')
+        except OSError:
+            return None
+        return 'file', stat.st_mtime_ns, stat.st_size
 
     def records_format_feets(self, data):
-        """
-            Проверяет, соответствует ли JSON-файл заданному формату.
-
-            :param: data - содержимое файла.
-            :return: True, если формат корректен, иначе False.
-            """
-
-        # Проверяем, что data является словарем
-        if not isinstance(data, dict):
-            return False
-
-        for name, records in data.items():
-            # Проверяем, что ключ — это строка
-            if not isinstance(name, str):
-                return False
-
-            # Проверяем, что значение — это список
-            if not isinstance(records, list):
-                return False
-
-            # Проверяем каждый элемент списка
-            for record in records:
-                # Проверяем, что запись — это список из 5 элементов
-                if not isinstance(record, list) or len(record) != 5:
-                    return False
-
-                # Проверяем типы элементов записи
-                if not (
-                        isinstance(record[0], int) and  # Счёт
-                        isinstance(record[1], str) and  # Дата/время
-                        isinstance(record[2], str) and  # Тип уровня
-                        isinstance(record[3], int) and  # Скорость
-                        isinstance(record[4], bool)  # Флаг
-                ):
-                    return False
-
-        # Если все проверки пройдены, возвращаем True
-        return True
+        return records_format_feets(data)
 
     def print_broken_records(self):
         self.records_are_broken = True
@@ -258,60 +382,36 @@ class Game:
         pygame.display.flip()
 
     def draw_high_scores(self):
-        try:
-            with open('scores.json', 'r') as file:
-                scores = json.load(file)
-
-            if self.records_are_broken:
-                self.records_are_broken = False
-                screen.fill((0, 0, 0))
-
-            if not self.records_format_feets(scores):
-                self.print_broken_records()
-            else:
-                font = pygame.font.Font(None, 36)
-                y = self.score_info_start - self.scroll_offset
-                for player, records in scores.items():
-                    text = font.render(f"Игрок: {player}:", True, (255, 255, 255))
-                    screen.blit(text, (50, y))
-                    y += self.score_info_start
-                    for record in records:
-                        if len(record) == 5:
-                            score, date_time, level_type, speed, evil_block_acivated = record
-                            text = font.render(f"Счет: {score}, Дата: {date_time},", True, (255, 255, 255))
-                            screen.blit(text, (70, y))
-                            y += self.score_info_step
-                            text = font.render(f"Уровень: {level_type}, Скорость: {speed},", True, (255, 255, 255))
-                            screen.blit(text, (70, y))
-                            y += self.score_info_step
-                            text = font.render(f"Активация блоков: {evil_block_acivated}.", True, (255, 255, 255))
-                            screen.blit(text, (70, y))
-                            y += self.score_info_start
-                    y += self.score_block_step
-
-                    pygame.draw.rect(screen, "black", (0, HEIGHT - 120, WIDTH, HEIGHT))
-                    text = font.render("Нажмите Esc для возврата в меню.", True, (255, 255, 255))
-                    screen.blit(text, (50, HEIGHT - 100))
-                    text = font.render("Используйте колесико мышки для навигации.", True, (255, 255, 255))
-                    screen.blit(text, (50, HEIGHT - 50))
-                    pygame.display.flip()
-
-                self.scores_height = copy.copy(y) + self.scroll_offset - (HEIGHT // 2)
-
-        except FileNotFoundError:
-            self.records_are_broken = True
+        cache = self.high_scores_cache
+        if cache.status == 'missing':
+            self.print_missing_records()
+        elif cache.status == 'broken':
+            self.print_broken_records()
+        else:
+            # Страницы рисуются в фоне; здесь только копирование готовых на экран
+            self.records_are_broken = False
             screen.fill((0, 0, 0))
-            font = pygame.font.Font(None, 36)
-            text = font.render("Файл с рекордами \"scores.json\" еще не создан!", True, (255, 255, 255))
-            screen.blit(text, (50, 80))
-            text = font.render("Создайте его или сохраните результат 1ой игры.", True, (255, 255, 255))
-            screen.blit(text, (50, 80 + 50))
-            text = font.render("Нажмите Esc для возврата в меню.", True, (255, 255, 255))
-            screen.blit(text, (50, HEIGHT - 100))
+            if cache.status == 'pending':
+                screen.blit(cache.placeholder, (50, self.score_info_start))
+            else:
+                cache.draw(self.scroll_offset)
+                self.scores_height = cache.scores_height
+            pygame.draw.rect(screen, "black", (0, HEIGHT - 120, WIDTH, HEIGHT))
+            for text, position in cache.footer:
+                screen.blit(text, position)
             pygame.display.flip()
-        except json.JSONDecodeError:
-            self.print_broken_records()
 
+    def print_missing_records(self):
+        self.records_are_broken = True
+        screen.fill((0, 0, 0))
+        font = pygame.font.Font(None, 36)
+        text = font.render("Файл с рекордами \"scores.json\" еще не создан!", True, (255, 255, 255))
+        screen.blit(text, (50, 80))
+        text = font.render("Создайте его или сохраните результат 1ой игры.", True, (255, 255, 255))
+        screen.blit(text, (50, 80 + 50))
+        text = font.render("Нажмите Esc для возврата в меню.", True, (255, 255, 255))
+        screen.blit(text, (50, HEIGHT - 100))
+        pygame.display.flip()
 
     def select_difficulty(self):
         while True:
@@ -458,8 +558,8 @@ class Game:
                 #         self.player_name += event.unicode
 
     def update(self):
-        self.current_time = pygame.time.get_ticks()
-        keys = pygame.key.get_pressed()
+        self.current_time = self.get_ticks()
+        keys = self.get_pressed()
         for i, key in enumerate([pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_f]):
             if keys[key] and self.current_time - self.gates[i].last_toggle_time > 200:  # Задержка 200 мс
                 self.gates[i].last_toggle_time = self.current_time
@@ -471,6 +571,8 @@ class Game:
                 if self.gates[i].color == self.color_manager.active_color:
                     chosen_color = 'black'
                 self.gates[i].set_color(chosen_color)
+                if self.telemetry:
+                    self.record_reaction(i)
 
         # Обработка выбора цвета
         if keys[pygame.K_j]:
@@ -489,6 +591,8 @@ class Game:
         # Генерация объектов с учетом сетки
         if self.grid_y % self.grid_step == 0:
             new_objects = self.generate_objects()
+            for obj in new_objects:
+                obj.spawn_time = self.current_time
             self.objects.extend(new_objects)
 
         self.grid_y += 5
@@ -500,26 +604,50 @@ class Game:
         for obj in self.objects:
             if obj.y + 50 >= HEIGHT - 100:  # Объект достиг ворот
                 gate = self.gates[obj.lane]
+                telemetry = self.telemetry
                 if isinstance(obj, Heart):
                     if gate.open and gate.color != 'black':  # Ворота должны быть активны
                         self.lives = min(self.lives + 1, 4)  # Восстановление жизни
+                        if telemetry:
+                            telemetry.record(EVENT_HEART, self.current_time, obj.lane)
                 elif isinstance(obj, EvilBlock):
                     if gate.open and gate.color != 'black':
                         self.lives = max(0, self.lives - 1)
+                        if telemetry:
+                            telemetry.record(EVENT_EVIL, self.current_time, obj.lane)
                 else:
                     if gate.open and gate.color == obj.color:
                         self.score += 5  # Начисление очков
+                        if telemetry:
+                            telemetry.record(EVENT_HIT, self.current_time, obj.lane)
                         if self.level_type == 'shuffle':
                             if random.randint(0, 2) == 1:
                                 self.color_manager.shuffle()
+                                if telemetry:
+                                    telemetry.record(EVENT_SHUFFLE, self.current_time)
                     else:
                         self.lives -= 1  # Потеря жизни
+                        if telemetry:
+                            telemetry.record(EVENT_MISS, self.current_time, obj.lane)
                 self.objects.remove(obj)
 
         # Проверка на окончание игры
         if self.lives <= 0:
             self.game_over = True
 
+        if self.state_export:
+            self.state_export.publish(self)
+
+    def record_reaction(self, lane):
+        # Время реакции считается по ближайшему к воротам объекту на дорожке
+        target = None
+        for obj in self.objects:
+            if obj.lane == lane and not obj.reacted and (target is None or obj.y > target.y):
+                target = obj
+        if target is not None:
+            target.reacted = True
+            self.telemetry.record(EVENT_REACTION, self.current_time, lane, self.current_time - target.spawn_time)
+
     def draw_playing(self):
         screen.fill((0, 0, 0))
         for obj in self.objects:
@@ -549,6 +677,8 @@ class Game:
         screen.blit(text, (WIDTH - 200, 10))
 
         pygame.display.flip()
+        if self.capture:
+            self.capture.submit(screen)
 
     def draw_menu(self):
         screen.fill((0, 0, 0))
@@ -702,6 +832,8 @@ class Game:
         return scroll_offset
 
     def menu_loop(self):
+        # Таблица рекордов готовится в фоне, пока игрок в меню
+        self.high_scores_cache.refresh()
         while True:
             self.draw_menu()
             for event in pygame.event.get():
@@ -715,9 +847,11 @@ class Game:
                     elif event.key == pygame.K_2:
                         self.select_difficulty()
                     elif event.key == pygame.K_3:
+                        self.high_scores_cache.refresh()
                         self.scroll_offset = 0
                         screen.fill((0, 0, 0))
                         while True:
+                            self.high_scores_cache.poll()
                             self.draw_high_scores()
                             for event in pygame.event.get():
                                 if event.type == pygame.QUIT:
@@ -741,7 +875,7 @@ class Game:
                     elif event.key == pygame.K_7:
                         sys.exit()
 
-    def game_loop(self):
+    def reset_game(self):
         self.gates = [Gate(i, key) for i, key in enumerate(['a', 's', 'd', 'f'])]
         self.lives = 4
         self.score = 0
@@ -749,6 +883,11 @@ class Game:
         self.grid_y = 0
         self.game_over = False
         self.paused = False
+
+    def game_loop(self):
+        self.reset_game()
+        if self.capture:
+            self.capture.start_session(self.speed)
         while True:
             self.handle_events()
             if not self.paused:
@@ -757,6 +896,10 @@ class Game:
                 self.clock.tick(self.speed)
 
                 if self.game_over:
+                    if self.telemetry:
+                        self.telemetry.record(EVENT_GAME_OVER, self.current_time, 0, self.score)
+                    if self.capture:
+                        self.capture.end_session(self.score)
                     return
 
     def draw_save_score_menu(self):
@@ -815,6 +958,285 @@ class Game:
         pygame.quit()
 
 
+# Клавиши, нажатые политикой ввода (замена pygame.key.get_pressed)
+class SoakKeys:
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+GATE_KEYS = [pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_f]
+COLOR_KEYS = [pygame.K_j, pygame.K_k, pygame.K_l, pygame.K_SEMICOLON]
+
+
+# Случайное нажатие клавиш
+class RandomInputPolicy:
+    def __init__(self, press_chance=0.1):
+        self.press_chance = press_chance
+
+    def keys(self, game):
+        return SoakKeys(key for key in GATE_KEYS + COLOR_KEYS if random.random() < self.press_chance)
+
+
+# "Бот": настраивает ворота под ближайший к ним объект
+class ScriptedInputPolicy:
+    def keys(self, game):
+        if not game.objects:
+            return SoakKeys()
+        obj = max(game.objects, key=lambda o: o.y)
+        gate_color = game.gates[obj.lane].color or 'black'
+        colors = game.color_manager.colors
+        if isinstance(obj, EvilBlock):
+            wanted = 'black'
+        elif isinstance(obj, Heart):
+            wanted = gate_color if gate_color != 'black' else colors[0]
+        else:
+            wanted = obj.color
+
+        if gate_color == wanted:
+            return SoakKeys()
+        if wanted == 'black':
+            # Повторное нажатие клавиши ворот гасит их, если выбран тот же цвет
+            color = gate_color
+        else:
+            color = wanted
+        if game.color_manager.active_color != color:
+            return SoakKeys([COLOR_KEYS[colors.index(color)]])
+        return SoakKeys([GATE_KEYS[obj.lane]])
+
+
+def current_rss():
+    """
+        Возвращает текущий размер резидентной памяти процесса в байтах.
+
+        :return: размер в байтах или None, если замер недоступен.
+        """
+    if psutil:
+        try:
+            return psutil.Process().memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        if sys.platform == 'win32':
+            return windows_working_set()
+        if os.path.exists('/proc/self/statm'):
+            with open('/proc/self/statm', 'r') as file:
+                return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        # macOS и BSD: текущий RSS (в килобайтах) сообщает ps
+        output = subprocess.run(['ps', '-o', 'rss=', '-p', str(os.getpid())],
+                                capture_output=True, text=True, timeout=5).stdout
+        return int(output.strip()) * 1024
+    except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+        return None
+
+
+def windows_working_set():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_current_process.restype = wintypes.HANDLE
+    get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    if not get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# Длительный прогон игры быстрее реального времени
+class SoakRunner:
+    def __init__(self, game, policy, hours, interval_minutes, max_rss_growth_mb, max_p99_growth):
+        self.game = game
+        self.policy = policy
+        self.total_ticks = int(hours * 3600 * 1000)
+        self.interval_ticks = int(interval_minutes * 60 * 1000)
+        self.max_rss_growth = max_rss_growth_mb * 1024 * 1024
+        self.max_p99_growth = max_p99_growth
+        self.sim_ticks = 0
+        self.frame_times = []
+        self.samples = []
+        self.games_played = 0
+        self.baseline_snapshot = None
+        self.crash = None  # Исключение из игрового цикла, если оно было
+
+    def sample(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        if self.baseline_snapshot is None:
+            self.baseline_snapshot = snapshot
+        top = snapshot.compare_to(self.baseline_snapshot, 'lineno')[:5]
+        sample = {
+            'sim_minutes': self.sim_ticks // 60000,
+            'rss': current_rss(),
+            'traced': tracemalloc.get_traced_memory()[0],
+            'top_allocators': [str(stat) for stat in top],
+            'gc_counts': gc.get_count(),
+            'gc_collections': [stats['collections'] for stats in gc.get_stats()],
+            'gc_objects': len(gc.get_objects()),
+            'game_objects': len(self.game.objects),
+            'frames': len(self.frame_times),
+            'frame_p50_ms': percentile(self.frame_times, 0.50) * 1000,
+            'frame_p99_ms': percentile(self.frame_times, 0.99) * 1000,
+            'games_played': self.games_played,
+        }
+        self.samples.append(sample)
+        self.frame_times = []
+        rss = f"{sample['rss'] // 1024} КБ" if sample['rss'] is not None else "недоступен"
+        print(f"[soak] {sample['sim_minutes']} мин: RSS {rss}, "
+              f"p99 {sample['frame_p99_ms']:.2f} мс, объектов {sample['game_objects']}.")
+
+    def run(self):
+        game = self.game
+        game.get_ticks = lambda: self.sim_ticks
+        game.get_pressed = lambda: self.policy.keys(game)
+        tick_ms = max(1, 1000 // game.speed)
+        next_sample = self.interval_ticks
+
+        tracemalloc.start()
+        game.reset_game()
+        try:
+            while self.sim_ticks < self.total_ticks:
+                pygame.event.pump()
+                start = time.perf_counter()
+                game.update()
+                game.draw_playing()
+                self.frame_times.append(time.perf_counter() - start)
+                self.sim_ticks += tick_ms
+
+                if game.game_over:
+                    self.games_played += 1
+                    game.draw_game_over()
+                    game.reset_game()
+
+                if self.sim_ticks >= next_sample:
+                    self.sample()
+                    next_sample += self.interval_ticks
+        except Exception as e:
+            # Падение игры - тоже результат прогона: фиксируем его в отчете
+            self.crash = {
+                'error': repr(e),
+                'traceback': traceback.format_exc(),
+                'sim_ms': self.sim_ticks,
+                'games_played': self.games_played,
+            }
+        finally:
+            tracemalloc.stop()
+        return self.report()
+
+    def report(self):
+        failures = []
+        if self.crash:
+            failures.append(f"Исключение на {self.crash['sim_ms'] / 60000:.1f} мин игрового времени "
+                            f"(игр сыграно: {self.crash['games_played']}): {self.crash['error']}.")
+        elif len(self.samples) < 2:
+            failures.append("Недостаточно замеров: увеличьте длительность или уменьшите интервал.")
+        if len(self.samples) >= 2:
+            # Первый замер считается базой (после прогрева)
+            first, last = self.samples[0], self.samples[-1]
+            if first['rss'] is None or last['rss'] is None:
+                print("[soak] RSS недоступен, проверка роста памяти пропущена.")
+            elif last['rss'] - first['rss'] > self.max_rss_growth:
+                failures.append(f"Рост RSS {(last['rss'] - first['rss']) // 1024} КБ превышает предел.")
+            if first['frame_p99_ms'] and last['frame_p99_ms'] > first['frame_p99_ms'] * self.max_p99_growth:
+                failures.append(f"p99 времени кадра вырос с {first['frame_p99_ms']:.2f} "
+                                f"до {last['frame_p99_ms']:.2f} мс.")
+        return {
+            'passed': not failures,
+            'failures': failures,
+            'games_played': self.games_played,
+            'crash': self.crash,
+            'samples': self.samples,
+        }
+
+
+def run_soak(args):
+    game = Game()
+    game.level_type = args.level
+    game.evil_blocks_activated = args.evil_blocks
+    policy = ScriptedInputPolicy() if args.soak_policy == 'scripted' else RandomInputPolicy()
+    runner = SoakRunner(game, policy, args.soak, args.soak_interval,
+                        args.soak_max_rss_growth, args.soak_max_p99_growth)
+    report = runner.run()
+    with open(args.soak_report, 'w') as file:
+        json.dump(report, file, indent=4)
+    for failure in report['failures']:
+        print(f"[soak] ОШИБКА: {failure}")
+    print(f"[soak] Игр сыграно: {report['games_played']}. Отчет: {args.soak_report}.")
+    pygame.quit()
+    return 0 if report['passed'] else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Color Gates Game")
+    parser.add_argument('--soak', type=float, metavar='HOURS',
+                        help="длительный прогон на HOURS часов игрового времени без окна")
+    parser.add_argument('--soak-policy', choices=['random', 'scripted'], default='scripted',
+                        help="политика ввода при прогоне")
+    parser.add_argument('--soak-interval', type=float, default=10, metavar='MINUTES',
+                        help="интервал замеров в минутах игрового времени")
+    parser.add_argument('--soak-max-rss-growth', type=float, default=20, metavar='MB',
+                        help="допустимый рост RSS между первым и последним замером")
+    parser.add_argument('--soak-max-p99-growth', type=float, default=1.5, metavar='RATIO',
+                        help="допустимый рост p99 времени кадра")
+    parser.add_argument('--soak-report', default='soak_report.json',
+                        help="файл отчета о прогоне")
+    parser.add_argument('--level', choices=['normal', 'multi_color', 'shuffle'], default='normal',
+                        help="тип уровня для прогона")
+    parser.add_argument('--evil-blocks', action='store_true',
+                        help="включить препятствия при прогоне")
+    parser.add_argument('--telemetry', metavar='DIR',
+                        help="записывать телеметрию сессии в папку DIR")
+    parser.add_argument('--score-service', nargs='?', const=DEFAULT_ADDRESS, metavar='ADDRESS',
+                        help="общий сервис рекордов (unix:/путь или хост:порт)")
+    parser.add_argument('--capture', metavar='DIR',
+                        help="записывать кадры игры в папку DIR")
+    parser.add_argument('--capture-min-score', type=int, default=0, metavar='SCORE',
+                        help="сохранять запись, только если счет не меньше SCORE")
+    parser.add_argument('--export-state', nargs='?', const=STATE_EXPORT_NAME, metavar='NAME',
+                        help="публиковать состояние игры в общей памяти NAME")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    init_display(headless=bool(args.soak))
+    if args.soak:
+        sys.exit(run_soak(args))
     game = Game()
+    if args.telemetry:
+        game.telemetry = Telemetry(args.telemetry)
+    if args.score_service:
+        game.score_client = ScoreClient(args.score_service)
+    if args.capture:
+        game.capture = FrameCapture(args.capture, screen, min_score=args.capture_min_score)
+    if args.export_state:
+        try:
+            game.state_export = StateExport(args.export_state)
+        except FileExistsError as e:
+            print(f"{e}.")
+            sys.exit(1)
     game.run()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import zlib
+from datetime import datetime
+from multiprocessing import shared_memory
+
+# Формат файла записи: заголовок, затем кадры, сжатые zlib, и итоговая запись
+MAGIC = b'CGV1'
+HEADER = struct.Struct('<4sIIIIIIIII')  # Магия, ширина, высота, шаг строки, байт на пиксель, маски RGBA, FPS
+RECORD = struct.Struct('<BII')  # Тип, номер кадра (или число потерянных), длина данных
+RECORD_FRAME = 1
+RECORD_END = 2
+
+
+def encode_loop(shm_name, frame_size, free, filled, directory, surface_format):
+    # Выполняется в отдельном процессе: сжимает кадры и пишет их в файл
+    shm = shared_memory.SharedMemory(name=shm_name)
+    file = None
+    part_path = None
+    sessions = 0
+    try:
+        while True:
+            message = filled.get()
+            kind = message[0]
+            if kind == 'frame':
+                _, slot, number = message
+                offset = slot * frame_size
+                data = zlib.compress(shm.buf[offset:offset + frame_size], 1)
+                free.put(slot)
+                if file:
+                    file.write(RECORD.pack(RECORD_FRAME, number, len(data)))
+                    file.write(data)
+            elif kind == 'start':
+                _, fps = message
+                # Номер сессии различает записи, начатые в одну и ту же секунду
+                sessions += 1
+                name = f"session-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sessions}"
+                part_path = os.path.join(directory, name + '.cgv.part')
+                file = open(part_path, 'wb')
+                file.write(HEADER.pack(MAGIC, *surface_format, fps))
+            elif kind == 'end':
+                _, score, dropped, keep = message
+                if file:
+                    file.write(RECORD.pack(RECORD_END, dropped, 0))
+                    file.close()
+                    file = None
+                    if keep:
+                        os.replace(part_path, part_path[:-len('.cgv.part')] + f"-{score}.cgv")
+                    else:
+                        os.remove(part_path)
+            elif kind == 'stop':
+                break
+    finally:
+        if file:
+            file.close()
+            os.remove(part_path)
+        shm.close()
+
+
+# Запись кадров игры: копия буфера экрана в общую память, сжатие в другом процессе
+class FrameCapture:
+    def __init__(self, directory, surface, slots=8, min_score=0):
+        self.min_score = min_score
+        width, height = surface.get_size()
+        self.frame_size = surface.get_pitch() * height
+        surface_format = (width, height, surface.get_pitch(), surface.get_bytesize(), *surface.get_masks())
+        os.makedirs(directory, exist_ok=True)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.frame_size * slots)
+        # Очереди передают только номера ячеек, сами кадры лежат в общей памяти
+        self.free = multiprocessing.Queue()
+        self.filled = multiprocessing.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.process = multiprocessing.Process(
+            target=encode_loop, name="capture",
+            args=(self.shm.name, self.frame_size, self.free, self.filled, directory, surface_format),
+            daemon=True)
+        self.process.start()
+        self.frame_number = 0
+        self.captured = 0
+        self.dropped = 0
+        self.closed = False
+        atexit.register(self.close)
+
+    def start_session(self, fps):
+        # Скорость может меняться в меню, поэтому FPS пишется в каждую запись
+        self.frame_number = 0
+        self.captured = 0
+        self.dropped = 0
+        self.filled.put(('start', fps))
+
+    def submit(self, surface):
+        self.frame_number += 1
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            # Кодировщик не успевает - кадр пропускается, игра не ждет
+            self.dropped += 1
+            return
+        offset = slot * self.frame_size
+        buffer = surface.get_buffer()
+        self.shm.buf[offset:offset + self.frame_size] = buffer
+        del buffer  # Снимает блокировку поверхности
+        self.filled.put_nowait(('frame', slot, self.frame_number))
+        self.captured += 1
+
+    def end_session(self, score):
+        self.filled.put(('end', score, self.dropped, score >= self.min_score))
+        if self.dropped:
+            print(f"Запись: сохранено кадров {self.captured}, пропущено {self.dropped}.")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.filled.put(('stop',))
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.shm.close()
+        self.shm.unlink()
+
+
+def read_frames(path):
+    """
+        Читает файл записи.
+
+        :param: path - путь к файлу .cgv.
+        :return: (заголовок, генератор пар (номер кадра, данные кадра)).
+        """
+    file = open(path, 'rb')
+    magic, *fields = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC:
+        file.close()
+        raise ValueError(f"{path}: не файл записи")
+    names = ('width', 'height', 'pitch', 'bytesize', 'rmask', 'gmask', 'bmask', 'amask', 'fps')
+    header = dict(zip(names, fields))
+
+    def frames():
+        with file:
+            while True:
+                raw = file.read(RECORD.size)
+                if len(raw) < RECORD.size:
+                    return
+                kind, number, length = RECORD.unpack(raw)
+                if kind == RECORD_END:
+                    header['dropped'] = number
+                    return
+                yield number, zlib.decompress(file.read(length))
+
+    return header, frames()
+
+
+def export_png(path, directory):
+    # Выгрузка кадров в PNG для сборки ролика внешними средствами
+    import pygame
+
+    header, frames = read_frames(path)
+    masks = (header['rmask'], header['gmask'], header['bmask'], header['amask'])
+    surface = pygame.Surface((header['width'], header['height']), 0, header['bytesize'] * 8, masks)
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for number, data in frames:
+        surface.get_buffer().write(data)
+        pygame.image.save(surface, os.path.join(directory, f"frame_{number:06d}.png"))
+        count += 1
+    print(f"Кадров: {count}, пропущено при записи: {header.get('dropped', 0)}.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Использование: python capture.py запись.cgv папка_для_png")
+        sys.exit(1)
+    export_png(sys.argv[1], sys.argv[2])
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zlib
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from records import records_format_feets, SCORE, DATE_TIME, LEVEL_TYPE, SPEED, EVIL_BLOCKS
+
+
+def record_order(record):
+    # Порядок сохранения - по дате; при равной дате перебитая запись считается более ранней
+    return record[DATE_TIME], record[SCORE], record[SPEED], record[EVIL_BLOCKS]
+
+
+# Граница уже просмотренных записей: скорости по возрастанию, очки по убыванию
+class Frontier:
+    def __init__(self):
+        self.speeds = []
+        self.scores = []
+
+    def beats(self, speed, score):
+        # Есть ли запись не медленнее и не с меньшим счетом
+        i = bisect_left(self.speeds, speed)
+        return i < len(self.speeds) and self.scores[i] >= score
+
+    def add(self, speed, score):
+        if self.beats(speed, score):
+            return
+        # Убираем точки, которые перебивает новая
+        end = bisect_right(self.speeds, speed)
+        start = end
+        while start > 0 and self.scores[start - 1] <= score:
+            start -= 1
+        self.speeds[start:end] = [speed]
+        self.scores[start:end] = [score]
+
+
+def fold_records(records):
+    """
+        Сохраняет записи игрока по порядку дат так же, как save_score.
+
+        Остается запись, которую не перебил ни один более поздний результат.
+        Записи просматриваются от поздних к ранним, а более поздние хранятся
+        как граница (скорость, счет) отдельно для уровней с серыми блоками и для всех,
+        поэтому сведение занимает O(K log K). Перебитость транзитивна: сводить можно
+        по частям и в любом порядке файлов, а записи одного файла не меняются.
+
+        :param: records - записи одного игрока.
+        :return: оставшиеся записи в порядке дат.
+        """
+    levels = {}
+    for record in records:
+        levels.setdefault(record[LEVEL_TYPE], []).append(record)
+    kept = set()
+    for level_records in levels.values():
+        level_records.sort(key=record_order)
+        later = Frontier()  # Все более поздние записи
+        later_evil = Frontier()  # Более поздние записи с серыми блоками
+        for record in reversed(level_records):
+            speed, score = record[SPEED], record[SCORE]
+            # Запись с серыми блоками перебивают только записи с серыми блоками
+            frontier = later_evil if record[EVIL_BLOCKS] else later
+            if frontier.beats(speed, score):
+                continue
+            kept.add(id(record))
+            later.add(speed, score)
+            if record[EVIL_BLOCKS]:
+                later_evil.add(speed, score)
+    return [record for record in sorted(records, key=record_order) if id(record) in kept]
+
+
+def shard_of(name, shards):
+    # Не hash(): он различается между процессами
+    return zlib.crc32(name.encode('utf-8')) % shards
+
+
+def load_file(path):
+    """
+        Читает и сводит один файл рекордов (выполняется в процессе пула).
+
+        :param: path - путь к файлу.
+        :return: (путь, таблица или None, число записей, текст ошибки или None).
+        """
+    try:
+        with open(path, 'r') as file:
+            data = json.load(file)
+    except (IOError, UnicodeDecodeError) as e:
+        return path, None, 0, f"ошибка чтения: {e}"
+    except json.JSONDecodeError as e:
+        return path, None, 0, f"некорректный JSON: {e}"
+
+    if not records_format_feets(data):
+        return path, None, 0, "неверный формат записей"
+
+    # Сводим внутри процесса, чтобы в основной передавать только неперебитые записи
+    scores = {}
+    count = 0
+    for name, records in data.items():
+        scores[name] = fold_records(records)
+        count += len(records)
+    return path, scores, count, None
+
+
+def reduce_shard(shard_path, part_path):
+    """
+        Сводит записи одной части и пишет ее игроков фрагментом итогового JSON
+        (выполняется в процессе пула).
+
+        :param: shard_path - файл части (строки [имя, запись]), part_path - файл фрагмента.
+        :return: (число игроков, число оставшихся записей).
+        """
+    players = {}
+    with open(shard_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            name, record = json.loads(line)
+            records = players.setdefault(name, [])
+            if record is not None:
+                records.append(record)
+    kept = 0
+    with open(part_path, 'w', encoding='utf-8') as file:
+        for i, name in enumerate(sorted(players)):
+            records = fold_records(players[name])
+            kept += len(records)
+            # Отступы как у json.dump(..., indent=4) для всей таблицы
+            entry = json.dumps(name) + ': ' + json.dumps(records, indent=4).replace('\n', '\n    ')
+            file.write((',\n    ' if i else '    ') + entry)
+    return len(players), kept
+
+
+def find_files(inputs):
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith('.json'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def merge_files(paths, output, workers=None, shards=64):
+    """
+        Параллельно читает файлы рекордов и сводит их в один файл.
+
+        В обработке одновременно находится не больше 2 * workers файлов. Неперебитые
+        записи каждого файла раскладываются по игрокам в shards временных частей на диске,
+        затем каждая часть сводится отдельно, а итоговый JSON собирается из фрагментов.
+        Память ограничена самой большой частью, а не всей таблицей.
+        Итоговый файл записывается, только если прочитан хотя бы один файл.
+
+        :param: paths - итератор путей, output - итоговый файл, workers - число процессов,
+                shards - число частей.
+        :return: (число файлов, число записей, число сохраненных записей, список (путь, ошибка)).
+        """
+    workers = workers or os.cpu_count() or 1
+    errors = []
+    files = 0
+    total = 0
+    kept = 0
+    directory = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(prefix='merge-', dir=directory) as spool, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        shard_paths = [os.path.join(spool, f"shard-{i}.jsonl") for i in range(shards)]
+        shard_files = [open(path, 'w', encoding='utf-8') for path in shard_paths]
+        try:
+            paths = iter(paths)
+            pending = set()
+            while True:
+                for path in paths:
+                    pending.add(pool.submit(load_file, path))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, table, count, error = future.result()
+                    files += 1
+                    if error:
+                        errors.append((path, error))
+                        continue
+                    total += count
+                    for name, records in table.items():
+                        file = shard_files[shard_of(name, shards)]
+                        if not records:
+                            # Игрок без записей остается в таблице
+                            file.write(json.dumps([name, None]) + '\n')
+                        for record in records:
+                            file.write(json.dumps([name, record]) + '\n')
+        finally:
+            for file in shard_files:
+                file.close()
+
+        if files == len(errors):
+            # Ни один файл не прочитан - итоговый файл не трогаем
+            return files, total, kept, errors
+
+        part_paths = [path[:-len('.jsonl')] + '.part' for path in shard_paths]
+        players = 0
+        for shard_players, shard_kept in pool.map(reduce_shard, shard_paths, part_paths):
+            players += shard_players
+            kept += shard_kept
+
+        # Как write_scores: сначала временный файл, затем замена
+        temp_path = os.path.join(spool, 'merged.json')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            if players:
+                file.write('{\n')
+                first = True
+                for part_path in part_paths:
+                    if os.path.getsize(part_path) == 0:
+                        continue
+                    if not first:
+                        file.write(',\n')
+                    first = False
+                    with open(part_path, 'r', encoding='utf-8') as part:
+                        shutil.copyfileobj(part, file)
+                file.write('\n}')
+            else:
+                file.write('{}')
+        os.replace(temp_path, output)
+    return files, total, kept, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Объединение таблиц рекордов Color Gates Game")
+    parser.add_argument('inputs', nargs='+', help="файлы scores.json или папки с ними")
+    parser.add_argument('-o', '--output', required=True, help="итоговый файл рекордов")
+    parser.add_argument('-f', '--force', action='store_true', help="перезаписать существующий итоговый файл")
+    parser.add_argument('-j', '--workers', type=int, help="число процессов")
+    parser.add_argument('--shards', type=int, default=64, help="число временных частей на диске")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("--shards должно быть не меньше 1")
+
+    if os.path.exists(args.output) and not args.force:
+        print(f"Файл \"{args.output}\" уже существует. Укажите другой файл или -f.", file=sys.stderr)
+        return 1
+
+    try:
+        files, total, kept, errors = merge_files(find_files(args.inputs), args.output, args.workers, args.shards)
+    except IOError as e:
+        print(f"Ошибка при сохранении файла: {e}.", file=sys.stderr)
+        return 1
+    for path, error in errors:
+        print(f"{path}: {error}.", file=sys.stderr)
+
+    if files == len(errors):
+        print("Нет ни одного корректного файла рекордов, ничего не записано.", file=sys.stderr)
+        return 1
+
+    print(f"Файлов: {files}, с ошибками: {len(errors)}. Записей: {total}, сохранено: {kept}.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
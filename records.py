@@ -0,0 +1,94 @@
+import json
+import os
+
+# Формат записи рекорда: [счет, дата/время, тип уровня, скорость, препятствия]
+SCORE, DATE_TIME, LEVEL_TYPE, SPEED, EVIL_BLOCKS = range(5)
+
+
+def records_format_feets(data):
+    """
+        Проверяет, соответствует ли JSON-файл заданному формату.
+
+        :param: data - содержимое файла.
+        :return: True, если формат корректен, иначе False.
+        """
+
+    # Проверяем, что data является словарем
+    if not isinstance(data, dict):
+        return False
+
+    for name, records in data.items():
+        # Проверяем, что ключ — это строка
+        if not isinstance(name, str):
+            return False
+
+        # Проверяем, что значение — это список
+        if not isinstance(records, list):
+            return False
+
+        # Проверяем каждый элемент списка
+        for record in records:
+            # Проверяем, что запись — это список из 5 элементов
+            if not isinstance(record, list) or len(record) != 5:
+                return False
+
+            # Проверяем типы элементов записи
+            if not (
+                    isinstance(record[0], int) and  # Счёт
+                    isinstance(record[1], str) and  # Дата/время
+                    isinstance(record[2], str) and  # Тип уровня
+                    isinstance(record[3], int) and  # Скорость
+                    isinstance(record[4], bool)  # Флаг
+            ):
+                return False
+
+    # Если все проверки пройдены, возвращаем True
+    return True
+
+
+def is_beaten(record, new_record):
+    """
+        Проверяет, перебит ли рекорд новым результатом.
+
+        :param: record - старая запись, new_record - новая запись.
+        :return: True, если старую запись нужно удалить.
+        """
+    return (
+            record[LEVEL_TYPE] == new_record[LEVEL_TYPE] and  # 1. Тип уровня совпадает
+            record[EVIL_BLOCKS] <= new_record[EVIL_BLOCKS] and  # 2. Если выбор препятствий <=
+            record[SPEED] <= new_record[SPEED] and  # 3. Скорость <= текущей
+            record[SCORE] <= new_record[SCORE]  # 4. Очки <= текущим
+    )
+
+
+def add_record(scores, name, new_record):
+    # Удаляем перебитые рекорды и добавляем новый
+    records = [record for record in scores.get(name, []) if not is_beaten(record, new_record)]
+    records.append(new_record)
+    scores[name] = records
+
+
+def read_scores(path):
+    # Отсутствующий или поврежденный файл считается пустой таблицей
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_scores(path, scores):
+    # Пишем во временный файл и подменяем, чтобы не оставить файл недописанным
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(scores, file, indent=4)
+    os.replace(temp_path, path)
+
+
+def save_record(path, name, new_record):
+    scores = read_scores(path)
+    add_record(scores, name, new_record)
+    try:
+        write_scores(path, scores)
+    except IOError as e:
+        print(f"Ошибка при сохранении файла: {e}.")
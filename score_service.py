@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from records import records_format_feets, write_scores, add_record, save_record
+
+DEFAULT_ADDRESS = 'unix:/tmp/color_gates_scores.sock' if hasattr(socket, 'AF_UNIX') else '127.0.0.1:8765'
+
+
+class ScoresNotLoaded(Exception):
+    # Сервис доступен, но таблица еще не получена
+    pass
+
+
+def parse_address(address):
+    """
+        Разбирает адрес сервиса.
+
+        :param: address - "unix:/путь/к/сокету" или "хост:порт".
+        :return: ('unix', путь) или ('tcp', (хост, порт)).
+        """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+# Хранилище рекордов сервиса: таблица в памяти, запись на диск пачками
+class ScoreStore:
+    def __init__(self, path, flush_interval):
+        self.path = path
+        self.flush_interval = flush_interval
+        try:
+            with open(path, 'r') as file:
+                self.scores = json.load(file)
+        except FileNotFoundError:
+            self.scores = {}
+        # Поврежденный файл не перезаписываем: ошибка JSON тоже ValueError
+        if not records_format_feets(self.scores):
+            raise ValueError(f"Файл с рекордами \"{path}\" поврежден")
+        self.version = 1
+        self.dirty = False
+        # Номера недавних сохранений: повтор запроса после тайм-аута не применяется дважды
+        self.applied = set()
+        self.applied_order = deque()
+        self.applied_limit = 10000
+
+    def save(self, name, record, save_id=None):
+        if save_id is not None:
+            if save_id in self.applied:
+                return
+            self.applied.add(save_id)
+            self.applied_order.append(save_id)
+            if len(self.applied_order) > self.applied_limit:
+                self.applied.discard(self.applied_order.popleft())
+        add_record(self.scores, name, record)
+        self.version += 1
+        self.dirty = True
+
+    async def flush(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        # Копия таблицы: пока поток пишет файл, цикл может принимать новые рекорды
+        data = json.loads(json.dumps(self.scores))
+        try:
+            await asyncio.to_thread(write_scores, self.path, data)
+        except IOError as e:
+            self.dirty = True
+            print(f"Ошибка при сохранении файла: {e}.", file=sys.stderr)
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+# Сервис рекордов: построчный JSON поверх Unix-сокета или TCP
+class ScoreService:
+    def __init__(self, store):
+        self.store = store
+
+    def handle_request(self, request):
+        op = request.get('op')
+        if op == 'save':
+            name, record = request.get('name'), request.get('record')
+            if not isinstance(name, str) or not records_format_feets({name: [record]}):
+                return {'ok': False, 'error': "неверный формат записи"}
+            self.store.save(name, record, request.get('id'))
+            return {'ok': True, 'version': self.store.version}
+        if op == 'scores':
+            # Клиент присылает свою версию; таблица передается, только если она изменилась
+            if request.get('version') == self.store.version:
+                return {'ok': True, 'version': self.store.version}
+            return {'ok': True, 'version': self.store.version, 'scores': self.store.scores}
+        return {'ok': False, 'error': f"неизвестная операция {op!r}"}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.handle_request(json.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    response = {'ok': False, 'error': "некорректный запрос"}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            if os.path.exists(target):
+                remove_stale_socket(target)
+            server = await asyncio.start_unix_server(self.handle_client, target)
+        else:
+            server = await asyncio.start_server(self.handle_client, *target)
+        flusher = asyncio.create_task(self.store.flush_loop())
+        print(f"Сервис рекордов слушает {address}.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.store.flush()
+
+
+def remove_stale_socket(path):
+    # Сокет от упавшего сервиса удаляем, а работающий сервис не трогаем
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"Сервис рекордов уже запущен на {path}")
+
+
+# Клиент сервиса рекордов: запросы не блокируют игру
+class ScoreClient:
+    def __init__(self, address, scores_path='scores.json', pool_size=2, timeout=1.0, retry_interval=5.0,
+                 refresh_interval=1.0):
+        self.kind, self.target = parse_address(address)
+        self.scores_path = scores_path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.refresh_interval = refresh_interval
+        # Пул постоянных соединений; соединение создается при первом запросе
+        self.connections = queue.LifoQueue()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="scores")
+        self.down_until = 0
+        self.reachable = True  # Пока не доказано обратное, считаем сервис доступным
+        self.cache = None
+        self.version = None
+        self.refreshed_at = 0
+        self.lock = threading.Lock()
+        # Неподтвержденные сохранения: повторяются по порядку, пока сервис не ответит
+        self.pending = deque()
+        self.pending_lock = threading.Lock()
+        self.retry_timer = None
+        # Таблицу запрашиваем сразу, чтобы к открытию рекордов кэш был готов
+        self.refreshing = True
+        self.executor.submit(self.refresh)
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def connect(self):
+        if self.kind == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.target)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile('rb')
+
+    def request(self, message):
+        try:
+            connection = self.connections.get_nowait()
+        except queue.Empty:
+            connection = self.connect()
+        sock, reader = connection
+        try:
+            sock.sendall(json.dumps(message).encode() + b'\n')
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("сервис закрыл соединение")
+            response = json.loads(line)
+        except (OSError, ValueError):
+            reader.close()
+            sock.close()
+            raise
+        self.connections.put(connection)
+        return response
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + self.retry_interval
+        self.reachable = False
+        with self.lock:
+            self.cache = None
+            self.version = None
+        # Закрываем соединения пула: после перезапуска сервиса они недействительны
+        while True:
+            try:
+                sock, reader = self.connections.get_nowait()
+            except queue.Empty:
+                break
+            reader.close()
+            sock.close()
+
+    def save(self, name, record):
+        self.pending.append((uuid.uuid4().hex, name, record))
+        self.executor.submit(self.send_pending)
+
+    def send_pending(self):
+        with self.pending_lock:
+            while self.pending:
+                save_id, name, record = self.pending[0]
+                try:
+                    response = self.request({'op': 'save', 'id': save_id, 'name': name, 'record': record})
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Сервис не запущен и файл не держит - сохраняем в файл, как без сервиса.
+                    # Повторная запись того же рекорда в файл ничего не меняет
+                    self.mark_down()
+                    save_record(self.scores_path, name, record)
+                    self.pending.popleft()
+                    continue
+                except (OSError, ValueError):
+                    # Сервис жив, но не ответил вовремя: запрос мог дойти, поэтому файл не трогаем,
+                    # а повторяем позже с тем же номером
+                    self.mark_down()
+                    self.schedule_retry()
+                    return
+                self.pending.popleft()
+                if not response.get('ok'):
+                    print(f"Сервис рекордов отклонил запись: {response.get('error')}.")
+                    continue
+                self.reachable = True
+                with self.lock:
+                    if self.cache is not None:
+                        # Копия при записи: игра может в этот момент обходить кэш
+                        cache = dict(self.cache)
+                        add_record(cache, name, record)
+                        self.cache = cache
+
+    def schedule_retry(self):
+        if self.retry_timer and self.retry_timer.is_alive():
+            return
+        self.retry_timer = threading.Timer(self.retry_interval, self.executor.submit, (self.send_pending,))
+        self.retry_timer.daemon = True
+        self.retry_timer.start()
+
+    def scores(self):
+        """
+            Возвращает таблицу рекордов из локального кэша и при необходимости
+            запрашивает обновление в фоне.
+
+            :return: таблица рекордов или None, если сервис недоступен и нужно читать файл.
+            :raises ScoresNotLoaded: сервис доступен, но таблица еще не получена.
+            """
+        if not self.available:
+            return None
+        with self.lock:
+            stale = time.monotonic() - self.refreshed_at >= self.refresh_interval
+            if stale and not self.refreshing:
+                self.refreshing = True
+                self.executor.submit(self.refresh)
+            if self.cache is not None:
+                return self.cache
+        # После отказа сервиса читаем файл, пока повторная попытка не удастся
+        if not self.reachable:
+            return None
+        raise ScoresNotLoaded()
+
+    def refresh(self):
+        try:
+            response = self.request({'op': 'scores', 'version': self.version})
+        except (OSError, ValueError):
+            self.mark_down()
+            return
+        finally:
+            with self.lock:
+                self.refreshing = False
+                self.refreshed_at = time.monotonic()
+        with self.lock:
+            if 'scores' in response:
+                self.cache = response['scores']
+            self.version = response.get('version')
+        self.reachable = True
+
+    def close(self):
+        if self.retry_timer:
+            self.retry_timer.cancel()
+        self.executor.submit(self.send_pending)
+        self.executor.shutdown(wait=True)
+        if self.pending:
+            print(f"Сервис рекордов не подтвердил {len(self.pending)} запис(ей); они не сохранены.")
+        self.mark_down()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервис рекордов Color Gates Game")
+    parser.add_argument('--listen', default=DEFAULT_ADDRESS, help="unix:/путь или хост:порт")
+    parser.add_argument('--scores', default='scores.json', help="файл рекордов")
+    parser.add_argument('--flush-interval', type=float, default=0.5, help="период записи на диск, с")
+    args = parser.parse_args(argv)
+
+    try:
+        store = ScoreStore(args.scores, args.flush_interval)
+    except ValueError as e:
+        print(f"{e}.", file=sys.stderr)
+        return 1
+    try:
+        asyncio.run(ScoreService(store).serve(args.listen))
+    except OSError as e:
+        print(f"{e}.", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
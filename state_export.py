@@ -0,0 +1,218 @@
+import atexit
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+DEFAULT_NAME = 'color_gates_state'
+LANES = 4
+MAX_OBJECTS = 16  # Объектов на дорожке; лишние не экспортируются
+
+# Коды цветов; вид объекта определяется цветом: white - сердечко, gray - препятствие
+COLOR_NAMES = ('black', 'red', 'green', 'blue', 'yellow', 'white', 'gray')
+COLOR_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
+NO_COLOR = -1
+
+# Раскладка блока памяти:
+#   заголовок: магия, версия, число дорожек, объектов на дорожке, PID процесса-писателя,
+#              счетчик последовательности
+#   данные: время (мс), счет, жизни, активный цвет, порядок цветов, цвета ворот,
+#           число объектов на дорожках, затем пары (цвет, y) по дорожкам
+MAGIC = b'CGS1'
+VERSION = 2
+HEADER = struct.Struct('<4sHBBI')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 16
+BODY = struct.Struct('<Iiib' + 'b' * LANES * 2 + 'B' * LANES + 'bh' * LANES * MAX_OBJECTS)
+BODY_OFFSET = SEQUENCE_OFFSET + SEQUENCE.size
+SIZE = BODY_OFFSET + BODY.size
+
+
+def attach(name):
+    # Подключение без трекера ресурсов: до Python 3.13 он удаляет блок
+    # при выходе любого подключившегося процесса, а не только создателя
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def pid_alive(pid):
+    if pid <= 0:
+        return False
+    if sys.platform == 'win32':
+        # os.kill на Windows завершает процесс, поэтому спрашиваем код завершения
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Экспорт состояния игры в общую память; запись без блокировок (seqlock)
+class StateExport:
+    def __init__(self, name=DEFAULT_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE)
+        except FileExistsError:
+            self.shm = attach(name)
+            self.check_stale(name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, LANES, MAX_OBJECTS, os.getpid())
+        self.sequence = 0
+        SEQUENCE.pack_into(self.buf, SEQUENCE_OFFSET, self.sequence)
+        # Значения для записи готовятся в заранее выделенном списке
+        self.values = [0] * (len(BODY.format) - 1)
+        self.objects_start = 4 + LANES * 3
+        self.closed = False
+        atexit.register(self.close)
+
+    def check_stale(self, name):
+        # Чужой блок повторно используем, только если его писатель уже завершился
+        if self.shm.size < SIZE:
+            self.shm.close()
+            raise FileExistsError(f"{name}: блок общей памяти занят и имеет другой размер")
+        magic, version, _, _, pid = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise FileExistsError(f"{name}: блок общей памяти занят другой программой")
+        if version == VERSION and pid_alive(pid):
+            self.shm.close()
+            raise FileExistsError(f"{name}: состояние уже публикует процесс {pid}; укажите другое имя")
+
+    def publish(self, game):
+        values = self.values
+        values[0] = game.current_time & 0xFFFFFFFF
+        values[1] = game.score
+        values[2] = game.lives
+        manager = game.color_manager
+        values[3] = COLOR_CODES.get(manager.active_color, NO_COLOR)
+        for i in range(LANES):
+            values[4 + i] = COLOR_CODES[manager.colors[i]]
+            values[4 + LANES + i] = COLOR_CODES.get(game.gates[i].color, NO_COLOR)
+            values[4 + LANES * 2 + i] = 0
+        counts_start = 4 + LANES * 2
+        for obj in game.objects:
+            count = values[counts_start + obj.lane]
+            if count < MAX_OBJECTS:
+                i = self.objects_start + (obj.lane * MAX_OBJECTS + count) * 2
+                values[i] = COLOR_CODES[obj.color]
+                values[i + 1] = obj.y
+                values[counts_start + obj.lane] = count + 1
+
+        # Нечетный счетчик - идет запись; читатель повторяет чтение
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buf, SEQUENCE_OFFSET, self.sequence)
+        BODY.pack_into(self.buf, BODY_OFFSET, *values)
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buf, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass  # Блок уже удален
+
+
+# Чтение состояния из общей памяти без блокировок
+class StateReader:
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = attach(name)
+        self.buf = self.shm.buf
+        magic, version, lanes, max_objects, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION or lanes != LANES or max_objects != MAX_OBJECTS:
+            self.close()
+            raise ValueError(f"{name}: неподдерживаемый формат блока состояния")
+
+    def sequence(self):
+        return SEQUENCE.unpack_from(self.buf, SEQUENCE_OFFSET)[0]
+
+    def read(self, timeout=1.0):
+        """
+            Читает согласованный снимок состояния.
+
+            :param: timeout - сколько секунд ждать завершения записи.
+            :return: (номер последовательности, кортеж значений в порядке BODY).
+            :raises TimeoutError: запись не завершилась (например, игра упала посреди нее).
+            """
+        deadline = None
+        while True:
+            before = self.sequence()
+            if not before & 1:
+                values = BODY.unpack_from(self.buf, BODY_OFFSET)
+                if self.sequence() == before:
+                    return before, values
+            # Запись идет: уступаем процессор вместо холостого цикла
+            if deadline is None:
+                deadline = time.monotonic() + timeout
+            elif time.monotonic() >= deadline:
+                raise TimeoutError("состояние игры не обновляется: запись не завершена")
+            time.sleep(0.0005)
+
+    def snapshot(self, timeout=1.0):
+        sequence, values = self.read(timeout)
+        counts_start = 4 + LANES * 2
+        objects_start = counts_start + LANES
+        lanes = []
+        for lane in range(LANES):
+            start = objects_start + lane * MAX_OBJECTS * 2
+            count = values[counts_start + lane]
+            lanes.append([(COLOR_NAMES[values[start + i * 2]], values[start + i * 2 + 1]) for i in range(count)])
+        return {
+            'sequence': sequence,
+            'time': values[0],
+            'score': values[1],
+            'lives': values[2],
+            'active_color': color_name(values[3]),
+            'colors': [color_name(code) for code in values[4:4 + LANES]],
+            'gates': [color_name(code) for code in values[4 + LANES:counts_start]],
+            'lanes': lanes,
+        }
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def color_name(code):
+    return COLOR_NAMES[code] if code != NO_COLOR else None
+
+
+if __name__ == "__main__":
+    # Простой просмотр состояния работающей игры
+    reader = StateReader(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_NAME)
+    last = None
+    try:
+        while True:
+            if reader.sequence() != last:
+                state = reader.snapshot()
+                last = state['sequence']
+                print(state)
+            time.sleep(0.1)
+    except TimeoutError as e:
+        print(f"{e}.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
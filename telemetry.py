@@ -0,0 +1,189 @@
+import array
+import atexit
+import os
+import struct
+import sys
+import threading
+from datetime import datetime
+
+# Типы событий
+EVENT_HIT = 1  # Блок пойман воротами своего цвета
+EVENT_MISS = 2  # Блок пропущен (потеряна жизнь)
+EVENT_HEART = 3  # Поймано сердечко
+EVENT_EVIL = 4  # Пойман серый блок
+EVENT_SHUFFLE = 5  # Перемешивание цветов на уровне "shuffle"
+EVENT_REACTION = 6  # Переключение ворот; значение - время от появления блока, мс
+EVENT_GAME_OVER = 7  # Конец игры; значение - счет
+EVENT_DROPPED = 8  # Значение - число событий, потерянных при переполнении буфера
+
+# Запись события: тип, время (мс), дорожка, значение - беззнаковые 32 бита;
+# время идет по кругу раз в ~49 суток
+FIELDS = 4
+RECORD = struct.Struct('<' + 'I' * FIELDS)
+MAGIC = b'CGT1'
+HEADER = struct.Struct('<4sH')
+
+
+# Телеметрия игровой сессии
+class Telemetry:
+    def __init__(self, directory, capacity=4096, flush_interval=1.0):
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        # Кольцевой буфер выделяется один раз; в кадре только запись чисел
+        self.buffer = array.array('I', bytes(RECORD.size * capacity))
+        self.head = 0  # Всего записано событий
+        self.tail = 0  # Всего сброшено на диск
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        name = f"session-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.cgt"
+        self.path = os.path.join(directory, name)
+        self.file = open(self.path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, FIELDS))
+
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.flush_loop, name="telemetry", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, kind, time, lane=0, value=0):
+        pending = self.head - self.tail
+        if pending >= self.capacity:
+            self.dropped += 1
+            return
+        i = (self.head % self.capacity) * FIELDS
+        buffer = self.buffer
+        buffer[i] = kind
+        buffer[i + 1] = time & 0xFFFFFFFF
+        buffer[i + 2] = lane
+        buffer[i + 3] = value & 0xFFFFFFFF
+        self.head += 1
+        if pending == self.capacity // 2:
+            self.wakeup.set()
+
+    def flush_loop(self):
+        while not self.stopping:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        head = self.head
+        tail = self.tail
+        if head == tail:
+            return
+        start = (tail % self.capacity) * FIELDS
+        end = (head % self.capacity) * FIELDS
+        try:
+            if start < end:
+                self.file.write(self.buffer[start:end].tobytes())
+            else:
+                # Данные переходят через конец буфера
+                self.file.write(self.buffer[start:].tobytes())
+                self.file.write(self.buffer[:end].tobytes())
+            self.file.flush()
+        except (IOError, ValueError) as e:
+            print(f"Ошибка при записи телеметрии: {e}.")
+        self.tail = head
+
+    def close(self):
+        if self.stopping:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join()
+        self.flush()
+        if self.dropped:
+            self.file.write(RECORD.pack(EVENT_DROPPED, 0, 0, self.dropped))
+        self.file.close()
+
+
+def read_events(path):
+    """
+        Читает события из файла телеметрии.
+
+        :param: path - путь к файлу сессии.
+        :return: генератор кортежей (тип, время, дорожка, значение).
+        """
+    with open(path, 'rb') as file:
+        magic, fields = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or fields != FIELDS:
+            raise ValueError(f"{path}: не файл телеметрии")
+        data = file.read()
+    # Неполная последняя запись (аварийное завершение) отбрасывается
+    usable = len(data) - len(data) % RECORD.size
+    yield from RECORD.iter_unpack(data[:usable])
+
+
+def aggregate(paths):
+    """
+        Сводит события из нескольких файлов телеметрии.
+
+        :param: paths - пути к файлам сессий.
+        :return: словарь со сводной статистикой.
+        """
+    stats = {
+        'sessions': 0,
+        'games': 0,
+        'total_score': 0,
+        'hits': [0, 0, 0, 0],
+        'misses': [0, 0, 0, 0],
+        'hearts': 0,
+        'evil_blocks': 0,
+        'shuffles': 0,
+        'reactions': 0,
+        'reaction_total_ms': 0,
+        'reaction_max_ms': 0,
+        'dropped': 0,
+    }
+    for path in paths:
+        stats['sessions'] += 1
+        for kind, time, lane, value in read_events(path):
+            if kind == EVENT_HIT:
+                stats['hits'][lane] += 1
+            elif kind == EVENT_MISS:
+                stats['misses'][lane] += 1
+            elif kind == EVENT_HEART:
+                stats['hearts'] += 1
+            elif kind == EVENT_EVIL:
+                stats['evil_blocks'] += 1
+            elif kind == EVENT_SHUFFLE:
+                stats['shuffles'] += 1
+            elif kind == EVENT_REACTION:
+                stats['reactions'] += 1
+                stats['reaction_total_ms'] += value
+                stats['reaction_max_ms'] = max(stats['reaction_max_ms'], value)
+            elif kind == EVENT_GAME_OVER:
+                stats['games'] += 1
+                stats['total_score'] += value
+            elif kind == EVENT_DROPPED:
+                stats['dropped'] += value
+    return stats
+
+
+def print_report(stats):
+    print(f"Сессий: {stats['sessions']}, игр: {stats['games']}.")
+    if stats['games']:
+        print(f"Средний счет: {stats['total_score'] / stats['games']:.1f}.")
+    for lane in range(4):
+        hits, misses = stats['hits'][lane], stats['misses'][lane]
+        rate = hits / (hits + misses) * 100 if hits + misses else 0
+        print(f"Дорожка {lane + 1}: поймано {hits}, пропущено {misses} ({rate:.1f}%).")
+    if stats['reactions']:
+        print(f"Реакция: в среднем {stats['reaction_total_ms'] / stats['reactions']:.0f} мс, "
+              f"максимум {stats['reaction_max_ms']} мс.")
+    print(f"Сердечек: {stats['hearts']}, серых блоков: {stats['evil_blocks']}, "
+          f"перемешиваний: {stats['shuffles']}.")
+    if stats['dropped']:
+        print(f"Потеряно событий: {stats['dropped']}.")
+
+
+if __name__ == "__main__":
+    paths = []
+    for arg in sys.argv[1:] or ['telemetry']:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg)) if name.endswith('.cgt'))
+        else:
+            paths.append(arg)
+    print_report(aggregate(paths))